@@ -16,6 +16,8 @@ TradingAgents-CN 股票筛选模块优化版
 """
 
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import SystemMessage
+import threading
 import time
 import json
 
@@ -26,6 +28,32 @@ logger = get_logger("default")
 # 导入Google工具调用处理器
 from tradingagents.agents.utils.google_tool_handler import GoogleToolCallHandler
 
+# 导入股票工具
+from tradingagents.utils.stock_utils import StockUtils
+
+# 热路径上用到的数据接口提前绑定到模块级名称，
+# 避免每次调用都走一遍 import 机制和属性解析（可选依赖缺失时置 None 降级）
+try:
+    from tradingagents.dataflows.interface import (
+        get_china_stock_info_unified as _get_china_stock_info_unified,
+    )
+except ImportError:
+    _get_china_stock_info_unified = None
+
+try:
+    from tradingagents.dataflows.data_source_manager import (
+        get_china_stock_info_unified as _get_china_stock_info_dict,
+    )
+except ImportError:
+    _get_china_stock_info_dict = None
+
+try:
+    from tradingagents.dataflows.providers.hk.improved_hk import (
+        get_hk_company_name_improved as _get_hk_company_name_improved,
+    )
+except ImportError:
+    _get_hk_company_name_improved = None
+
 
 # ============================================================================
 # Prompt 模板定义（集中管理，便于维护和 A/B 测试）
@@ -165,46 +193,124 @@ STOCK_SCREENER_PROMPT = """您是一位专业的A股量化筛选专家，负责
 # 辅助函数
 # ============================================================================
 
+class _TTLCache:
+    """简易线程安全 TTL 缓存（单文件模块，避免引入 cachetools 依赖）"""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 86400):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data = {}  # key -> (过期时间戳, 值)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._data[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._data) >= self._maxsize:
+                # 先清理过期项，仍然超限则整体清空（保持实现简单）
+                now = time.time()
+                self._data = {k: v for k, v in self._data.items() if v[0] >= now}
+                if len(self._data) >= self._maxsize:
+                    self._data.clear()
+            self._data[key] = (time.time() + self._ttl, value)
+
+
+# 公司名称/市场信息基本不变，按 24 小时 TTL 缓存，避免每次调用都走网络/数据库
+_COMPANY_NAME_CACHE = _TTLCache(maxsize=4096, ttl=86400)
+_MARKET_INFO_CACHE = _TTLCache(maxsize=4096, ttl=86400)
+
+
+def _market_key(market_info: dict) -> str:
+    """把市场信息 dict 压缩成可哈希的缓存键"""
+    if market_info.get('is_china'):
+        return "cn"
+    if market_info.get('is_hk'):
+        return "hk"
+    if market_info.get('is_us'):
+        return "us"
+    return "x"
+
+
+def _get_market_info_cached(ticker: str) -> dict:
+    """带 TTL 缓存的 StockUtils.get_market_info"""
+    market_info = _MARKET_INFO_CACHE.get(ticker)
+    if market_info is None:
+        market_info = StockUtils.get_market_info(ticker)
+        _MARKET_INFO_CACHE.set(ticker, market_info)
+    return market_info
+
+
 def _get_company_name_for_china_market(ticker: str, market_info: dict) -> str:
     """
-    为中国市场分析师获取公司名称（保持原有逻辑不变）
+    为中国市场分析师获取公司名称（带 TTL 缓存，查询逻辑保持原样）
+    """
+    cache_key = (ticker, _market_key(market_info))
+    cached = _COMPANY_NAME_CACHE.get(cache_key)
+    if cached is not None:
+        logger.debug(f"📊 [中国市场分析师] 公司名称缓存命中: {ticker} -> {cached}")
+        return cached
+
+    company_name, cacheable = _lookup_company_name(ticker, market_info)
+    if cacheable:
+        _COMPANY_NAME_CACHE.set(cache_key, company_name)
+    return company_name
+
+
+def _lookup_company_name(ticker: str, market_info: dict) -> tuple:
+    """
+    实际执行公司名称查询（查询逻辑保持原有逻辑不变）
+
+    Returns:
+        (公司名称, 是否可缓存)。查询失败返回的占位名称不可缓存，
+        避免一次临时故障把占位名污染缓存一整天，下次调用会重试。
     """
     try:
         if market_info['is_china']:
-            from tradingagents.dataflows.interface import get_china_stock_info_unified
-            stock_info = get_china_stock_info_unified(ticker)
-            
+            if _get_china_stock_info_unified is None:
+                raise ImportError("tradingagents.dataflows.interface 不可用")
+            stock_info = _get_china_stock_info_unified(ticker)
+
             logger.debug(f"📊 [中国市场分析师] 获取股票信息返回: {stock_info[:200] if stock_info else 'None'}...")
             
             if stock_info and "股票名称:" in stock_info:
                 company_name = stock_info.split("股票名称:")[1].split("\n")[0].strip()
                 logger.info(f"✅ [中国市场分析师] 成功获取中国股票名称: {ticker} -> {company_name}")
-                return company_name
+                return company_name, True
             else:
                 logger.warning(f"⚠️ [中国市场分析师] 无法从统一接口解析股票名称: {ticker}，尝试降级方案")
                 try:
-                    from tradingagents.dataflows.data_source_manager import get_china_stock_info_unified as get_info_dict
-                    info_dict = get_info_dict(ticker)
+                    if _get_china_stock_info_dict is None:
+                        raise ImportError("tradingagents.dataflows.data_source_manager 不可用")
+                    info_dict = _get_china_stock_info_dict(ticker)
                     if info_dict and info_dict.get('name'):
                         company_name = info_dict['name']
                         logger.info(f"✅ [中国市场分析师] 降级方案成功获取股票名称: {ticker} -> {company_name}")
-                        return company_name
+                        return company_name, True
                 except Exception as e:
                     logger.error(f"❌ [中国市场分析师] 降级方案也失败: {e}")
                 
                 logger.error(f"❌ [中国市场分析师] 所有方案都无法获取股票名称: {ticker}")
-                return f"股票代码{ticker}"
+                return f"股票代码{ticker}", False
                 
         elif market_info['is_hk']:
             try:
-                from tradingagents.dataflows.providers.hk.improved_hk import get_hk_company_name_improved
-                company_name = get_hk_company_name_improved(ticker)
+                if _get_hk_company_name_improved is None:
+                    raise ImportError("improved_hk 提供器不可用")
+                company_name = _get_hk_company_name_improved(ticker)
                 logger.debug(f"📊 [中国市场分析师] 使用改进港股工具获取名称: {ticker} -> {company_name}")
-                return company_name
+                return company_name, True
             except Exception as e:
                 logger.debug(f"📊 [中国市场分析师] 改进港股工具获取名称失败: {e}")
                 clean_ticker = ticker.replace('.HK', '').replace('.hk', '')
-                return f"港股{clean_ticker}"
+                return f"港股{clean_ticker}", False
                 
         elif market_info['is_us']:
             us_stock_names = {
@@ -214,13 +320,56 @@ def _get_company_name_for_china_market(ticker: str, market_info: dict) -> str:
             }
             company_name = us_stock_names.get(ticker.upper(), f"美股{ticker}")
             logger.debug(f"📊 [中国市场分析师] 美股名称映射: {ticker} -> {company_name}")
-            return company_name
+            return company_name, True
         else:
-            return f"股票{ticker}"
+            return f"股票{ticker}", True
             
     except Exception as e:
         logger.error(f"❌ [中国市场分析师] 获取公司名称失败: {e}")
-        return f"股票{ticker}"
+        return f"股票{ticker}", False
+
+
+def _is_anthropic_model(llm) -> bool:
+    """判断是否为 Anthropic 模型（支持 cache_control 提示词缓存）"""
+    llm_class = llm.__class__.__name__.lower()
+    model_name = str(getattr(llm, "model", "") or getattr(llm, "model_name", "")).lower()
+    return "anthropic" in llm_class or "claude" in model_name
+
+
+def _build_static_system_message(static_text: str, llm) -> SystemMessage:
+    """
+    构建静态系统消息，并在支持的模型上打开提供商侧提示词缓存
+
+    - Anthropic: 在内容块上附加 cache_control（ephemeral），后续调用命中缓存，
+      输入 Token 成本和首 Token 延迟大幅下降
+    - OpenAI: 前缀 ≥1024 token 时自动缓存，无需改动
+    - 其他模型: 退化为普通字符串内容
+    """
+    if _is_anthropic_model(llm):
+        return SystemMessage(content=[{
+            "type": "text",
+            "text": static_text,
+            "cache_control": {"type": "ephemeral"},
+        }])
+    return SystemMessage(content=static_text)
+
+
+def _extract_cache_usage(result) -> dict:
+    """从 LLM 响应中提取提示词缓存的命中情况（用于监控）"""
+    usage = getattr(result, "usage_metadata", None) or {}
+    details = usage.get("input_token_details", {}) if isinstance(usage, dict) else {}
+    response_meta = getattr(result, "response_metadata", None) or {}
+    raw_usage = response_meta.get("usage", {}) if isinstance(response_meta, dict) else {}
+    return {
+        "cache_creation_input_tokens": (
+            details.get("cache_creation")
+            or raw_usage.get("cache_creation_input_tokens", 0)
+        ),
+        "cache_read_input_tokens": (
+            details.get("cache_read")
+            or raw_usage.get("cache_read_input_tokens", 0)
+        ),
+    }
 
 
 def _get_tool_names(tools: list) -> str:
@@ -262,56 +411,59 @@ def create_china_market_analyst(llm, toolkit, mode: str = "quick"):
     else:
         system_message = QUICK_SCREENING_PROMPT
         analyst_name = "中国市场快速评估师"
-    
+
+    # 工具集、Prompt 模板和 bind_tools 在工厂内只构建一次
+    # （模板解析和工具 JSON-Schema 生成都不便宜，不该出现在每次调用的热路径上）
+    tools = [
+        toolkit.get_china_stock_data,
+        toolkit.get_china_market_overview,
+        toolkit.get_YFin_data,
+    ]
+
+    # 静态前缀 + 动态后缀，静态部分作为缓存断点
+    # （所有不随调用变化的文本放在最前面，提供商侧提示词缓存才能命中）
+    static_text = (
+        f"{system_message}\n\n"
+        "---\n"
+        f"可用工具: {_get_tool_names(tools)}\n"
+        "---\n"
+        "请用中文输出分析结果。"
+    )
+    # 动态后缀用 human 消息承载：Anthropic/Google 要求 system 消息必须位于首位
+    base_prompt = ChatPromptTemplate.from_messages([
+        _build_static_system_message(static_text, llm),
+        (
+            "human",
+            "当前日期: {current_date}\n"
+            "分析标的: {ticker} ({company_name})",
+        ),
+        MessagesPlaceholder(variable_name="messages"),
+    ])
+    chain = base_prompt | llm.bind_tools(tools)
+
     def china_market_analyst_node(state):
         current_date = state["trade_date"]
         ticker = state["company_of_interest"]
-        
-        # 获取股票市场信息
-        from tradingagents.utils.stock_utils import StockUtils
-        market_info = StockUtils.get_market_info(ticker)
-        
-        # 获取公司名称
-        company_name = _get_company_name_for_china_market(ticker, market_info)
+
+        # 获取公司名称（优先使用调用方预取的结果，如 A/B 测试的批量预热）
+        company_name = state.get("_prefetched_company_name")
+        if not company_name:
+            market_info = _get_market_info_cached(ticker)
+            company_name = _get_company_name_for_china_market(ticker, market_info)
         logger.info(f"[{analyst_name}] 分析标的: {ticker} ({company_name})")
-        
-        # 定义工具集
-        tools = [
-            toolkit.get_china_stock_data,
-            toolkit.get_china_market_overview,
-            toolkit.get_YFin_data,
-        ]
-        
-        # 构建 Prompt（精简的系统指令，避免重复）
-        prompt = ChatPromptTemplate.from_messages([
-            (
-                "system",
-                "{system_message}\n\n"
-                "---\n"
-                "当前日期: {current_date}\n"
-                "分析标的: {ticker} ({company_name})\n"
-                "可用工具: {tool_names}\n"
-                "---\n"
-                "请用中文输出分析结果。",
-            ),
-            MessagesPlaceholder(variable_name="messages"),
-        ])
-        
-        # 填充变量
-        prompt = prompt.partial(
-            system_message=system_message,
-            current_date=current_date,
-            ticker=ticker,
-            company_name=company_name,
-            tool_names=_get_tool_names(tools)
-        )
-        
-        # 调用 LLM
-        chain = prompt | llm.bind_tools(tools)
-        result = chain.invoke(state["messages"])
+
+        # 调用 LLM（仅填充动态变量）
+        result = chain.invoke({
+            "messages": state["messages"],
+            "current_date": current_date,
+            "ticker": ticker,
+            "company_name": company_name,
+        })
         
         # 处理 Google 模型的工具调用
+        tool_calls_handled = False
         if GoogleToolCallHandler.is_google_model(llm):
+            tool_calls_handled = True  # 处理器内部已完成工具调用闭环
             logger.info(f"📊 [{analyst_name}] 检测到Google模型，使用统一工具调用处理器")
             
             analysis_prompt_template = GoogleToolCallHandler.create_analysis_prompt(
@@ -340,6 +492,8 @@ def create_china_market_analyst(llm, toolkit, mode: str = "quick"):
             "china_market_report": report,
             "sender": "ChinaMarketAnalyst",
             "analysis_mode": mode,  # 新增：标记分析模式
+            "cache_usage": _extract_cache_usage(result),  # 新增：提示词缓存命中监控
+            "tool_calls_handled": tool_calls_handled,  # 新增：工具调用是否已在节点内闭环
         }
     
     return china_market_analyst_node
@@ -350,40 +504,40 @@ def create_china_stock_screener(llm, toolkit):
     创建中国股票筛选器
     """
     
+    tools = [
+        toolkit.get_china_market_overview,
+    ]
+
+    # 使用专门的筛选器 Prompt：静态前缀作为缓存断点，动态日期放在后面
+    # 模板和 bind_tools 在工厂内只构建一次
+    static_text = (
+        f"{STOCK_SCREENER_PROMPT}\n\n"
+        "---\n"
+        f"可用工具: {_get_tool_names(tools)}\n"
+        "---\n"
+        "请用中文输出筛选结果。"
+    )
+    # 动态日期用 human 消息承载：Anthropic/Google 要求 system 消息必须位于首位
+    base_prompt = ChatPromptTemplate.from_messages([
+        _build_static_system_message(static_text, llm),
+        ("human", "当前日期: {current_date}"),
+        MessagesPlaceholder(variable_name="messages"),
+    ])
+    chain = base_prompt | llm.bind_tools(tools)
+
     def china_stock_screener_node(state):
         current_date = state["trade_date"]
-        
-        tools = [
-            toolkit.get_china_market_overview,
-        ]
-        
-        # 使用专门的筛选器 Prompt
-        prompt = ChatPromptTemplate.from_messages([
-            (
-                "system", 
-                "{system_message}\n\n"
-                "---\n"
-                "当前日期: {current_date}\n"
-                "可用工具: {tool_names}\n"
-                "---\n"
-                "请用中文输出筛选结果。",
-            ),
-            MessagesPlaceholder(variable_name="messages"),
-        ])
-        
-        prompt = prompt.partial(
-            system_message=STOCK_SCREENER_PROMPT,
-            current_date=current_date,
-            tool_names=_get_tool_names(tools)
-        )
-        
-        chain = prompt | llm.bind_tools(tools)
-        result = chain.invoke(state["messages"])
-        
+
+        result = chain.invoke({
+            "messages": state["messages"],
+            "current_date": current_date,
+        })
+
         return {
             "messages": [result],
             "stock_screening_report": result.content,
             "sender": "ChinaStockScreener",
+            "cache_usage": _extract_cache_usage(result),
         }
     
     return china_stock_screener_node